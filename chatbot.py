@@ -9,24 +9,37 @@ from PIL import Image
 import time
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from insights import generate_advanced_insights
+from warmup import DataWarmup, replace_active_warmup, STATUS_LOADING, STATUS_READY, STATUS_ERROR
 from urllib.parse import quote_plus
  
 load_dotenv()
 
 api_key = os.getenv("API_KEY")
+refresh_interval = int(os.getenv("REFRESH_INTERVAL_SECONDS", "300"))
 st.set_page_config(page_title="Análise de Inadimplência", page_icon="")
 
 if "app_initialized" not in st.session_state:
     st.session_state.app_initialized = False
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "pending_questions" not in st.session_state:
+    st.session_state.pending_questions = []
+
+SUGGESTED_QUESTIONS = [
+    "Qual estado com maior inadimplência e quais os valores devidos?",
+    "Qual tipo de cliente apresenta o maior número de operações?",
+    "Em qual modalidade existe maior inadimplência?",
+    "Compare a inadimplência entre PF e PJ",
+    "Qual ocupação entre PF possui maior inadimplência?",
+    "Qual o principal porte de cliente com inadimplência entre PF?",
+]
 
 def get_llm_client():
     return ChatOpenAI(
         api_key=api_key,
-        base_url="https://api.deepseek.com",
+        base_url=os.getenv("LLM_BASE_URL", "https://api.deepseek.com"),
         model="deepseek-chat",
         http_client=httpx.Client(verify=False)
     )
@@ -63,54 +76,44 @@ def get_llm_client():
 #         print(f"Erro ao conectar ao banco de dados: {e}")
 #         return None
 
-def connect_to_db():
-    try:
-        # Verificar se está rodando no Streamlit Cloud (usando st.secrets) ou localmente (usando os.getenv)
-        if "STREAMLIT_CLOUD" in os.environ:  # Variável fictícia, ajustaremos a lógica
+def get_connection_string(verbose=True):
+    """
+    Monta a string de conexão com o banco a partir de INADIMPLENCIA_DATABASE_URL, st.secrets ou do .env
+    """
+    # Permite apontar para outro banco (ex.: o banco local do teste de carga)
+    connection_string = os.getenv("INADIMPLENCIA_DATABASE_URL")
+    if connection_string:
+        if verbose:
+            print("Usando a conexão definida em INADIMPLENCIA_DATABASE_URL")
+        return connection_string
+
+    # Verificar se está rodando no Streamlit Cloud (usando st.secrets) ou localmente (usando os.getenv)
+    if "STREAMLIT_CLOUD" in os.environ:  # Variável fictícia, ajustaremos a lógica
+        if verbose:
             print("Rodando no Streamlit Cloud, usando st.secrets")
-            host = st.secrets["SERVER"]
-            database = st.secrets["DATABASE"]
-            username = st.secrets["USERNAME"]
-            password = st.secrets["PASSWORD"]
-            port = st.secrets["PORT"]
-        else:
+        host = st.secrets["SERVER"]
+        database = st.secrets["DATABASE"]
+        username = st.secrets["USERNAME"]
+        password = st.secrets["PASSWORD"]
+        port = st.secrets["PORT"]
+    else:
+        if verbose:
             print("Rodando localmente, usando variáveis do .env")
-            host = os.getenv("SERVER")
-            database = os.getenv("DATABASE")
-            username = os.getenv("USERNAME")
-            password = os.getenv("PASSWORD")
-            port = os.getenv("PORT")
-
-        # Validar os valores
-        if not all([host, database, username, password, port]):
-            error_msg = "Uma ou mais variáveis de conexão com o banco não estão definidas"
-            print(error_msg)
-            if hasattr(st, "error"):
-                st.error(error_msg)
-            raise ValueError(error_msg)
-
-        # Codificar a senha para lidar com caracteres especiais
-        encoded_password = quote_plus(password)
-
-        # String de conexão com senha codificada
-        connection_string = f"postgresql+psycopg2://{username}:{encoded_password}@{host}:{port}/{database}"
-
-        # Criar engine do SQLAlchemy
-        engine = create_engine(connection_string)
-
-        # Testar a conexão
-        with engine.connect() as connection:
-            success_msg = "Conexão com o banco de dados estabelecida com sucesso!"
-            print(success_msg)
-        
-        return engine
+        host = os.getenv("SERVER")
+        database = os.getenv("DATABASE")
+        username = os.getenv("USERNAME")
+        password = os.getenv("PASSWORD")
+        port = os.getenv("PORT")
 
-    except Exception as e:
-        error_msg = f"Erro ao conectar ao banco de dados: {e}"
-        print(error_msg)
-        if hasattr(st, "error"):
-            st.error(error_msg)
-        return None
+    # Validar os valores
+    if not all([host, database, username, password, port]):
+        raise ValueError("Uma ou mais variáveis de conexão com o banco não estão definidas")
+
+    # Codificar a senha para lidar com caracteres especiais
+    encoded_password = quote_plus(password)
+
+    # String de conexão com senha codificada
+    return f"postgresql+psycopg2://{username}:{encoded_password}@{host}:{port}/{database}"
 
 def classify_user_intent(prompt, llm):
     """
@@ -230,38 +233,10 @@ def process_question_with_insights(prompt, intent, dynamic_query, df, insights,
     
     return response.content
 
-def main():
-    st.title("Chatbot Inadimplinha")
-    st.caption("Chatbot Inadimplinha desenvolvido por Grupo de Inadimplência EY")
-
-    # Conectar ao banco de dados
-    conn = connect_to_db()
-    if conn is None:
-        st.stop()
-    
-    # Inicializar o modelo LLM
-    llm = get_llm_client()
-    
-    # Carregar os dados do banco e gerar insights apenas uma vez
-    if "insights" not in st.session_state or "df" not in st.session_state:
-        try:
-            # Carregar os dados
-            table = "table_agg_inad_consolidado"
-            query = f"SELECT * FROM {table}"
-            df = pd.read_sql(query, conn)
-            st.session_state.df = df
-            
-            # Gerar insights
-            st.session_state.insights = generate_advanced_insights(df)
-            
-            print(f"Total de linhas carregadas do banco: {len(df)}")
-            print(f"Primeiras linhas do DataFrame:\n{df.head()}")
-        except Exception as e:
-            st.error(f"Erro ao carregar dados ou gerar insights: {str(e)}")
-            conn.dispose()
-            st.stop()
-    
-    # Criar a cadeia de execução padrão para casos simples
+def build_default_chain(llm):
+    """
+    Cria a cadeia de execução padrão para perguntas gerais
+    """
     prompt_template = ChatPromptTemplate.from_messages([
         ("system", (
             "Você é um especialista em análise de inadimplência no Brasil. "
@@ -277,8 +252,187 @@ def main():
         )),
         ("human", "{input}")
     ])
-    
-    chain = prompt_template | llm
+
+    return prompt_template | llm
+
+def answer_question(prompt, llm, df, insights, conversation=None):
+    """
+    Executa o fluxo completo de resposta: intenção, consulta dinâmica e geração da resposta
+    """
+    # Classificar a intenção do usuário
+    intent = classify_user_intent(prompt, llm)
+    print(f"Intenção classificada como: {intent}")
+
+    # Gerar consulta dinâmica baseada na intenção
+    dynamic_query = generate_dynamic_query(intent, prompt, llm)
+    print(f"Consulta dinâmica gerada: {dynamic_query}")
+
+    # Processar a pergunta com insights e resultados dinâmicos
+    if intent != "GERAL":
+        return process_question_with_insights(prompt, intent, dynamic_query, df, insights, llm)
+
+    # Para perguntas gerais, usar o fluxo padrão (com histórico quando disponível)
+    if conversation is None:
+        return build_default_chain(llm).invoke({"input": prompt, "insights": insights}).content
+
+    response = conversation.invoke(
+        {"input": prompt, "insights": insights},
+        config={"configurable": {"session_id": "default"}}
+    )
+    return response.content
+
+def load_dataset(table="table_agg_inad_consolidado"):
+    """
+    Carrega a tabela consolidada de inadimplência do banco de dados
+    """
+    # Roda em segundo plano: sem st.error; erros chegam ao DataWarmup, que exibe o estado na interface
+    engine = create_engine(get_connection_string(verbose=False))
+    try:
+        df = pd.read_sql(f"SELECT * FROM {table}", engine)
+    finally:
+        engine.dispose()
+
+    print(f"Total de linhas carregadas do banco: {len(df)}")
+    print(f"Primeiras linhas do DataFrame:\n{df.head()}")
+    return df
+
+def make_table_fingerprint(table="table_agg_inad_consolidado"):
+    """
+    Cria a função que calcula uma assinatura barata da tabela (linhas, maior data_base e
+    marcador de alterações), reutilizando um único engine entre as verificações
+    """
+    engine = None
+
+    def fetch_table_fingerprint():
+        nonlocal engine
+        # Sem logs de conexão nem st.error: roda em segundo plano, fora de qualquer sessão
+        if engine is None:
+            engine = create_engine(get_connection_string(verbose=False), pool_size=1, max_overflow=0)
+
+        # data_base é texto dd/mm/aaaa; comparar como data, não como string
+        if engine.dialect.name == "postgresql":
+            max_data_base = "MAX(to_date(data_base, 'DD/MM/YYYY'))"
+        else:
+            max_data_base = "MAX(substr(data_base, 7, 4) || '-' || substr(data_base, 4, 2) || '-' || substr(data_base, 1, 2))"
+
+        with engine.connect() as connection:
+            row_count, latest_data_base = connection.execute(
+                text(f"SELECT COUNT(*), {max_data_base} FROM {table}")
+            ).one()
+
+            # Contadores de escrita do Postgres capturam cargas que não mudam contagem nem data
+            update_marker = None
+            if engine.dialect.name == "postgresql":
+                try:
+                    update_marker = connection.execute(
+                        text("SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables WHERE relname = :table"),
+                        {"table": table}
+                    ).scalar()
+                except Exception:
+                    update_marker = None
+
+        return row_count, str(latest_data_base), update_marker
+
+    return fetch_table_fingerprint
+
+@st.cache_resource
+def get_data_warmup():
+    """
+    Inicia, uma vez por processo, o carregamento e a atualização dos dados, insights e respostas sugeridas
+    """
+    warmup = DataWarmup(
+        load_data=load_dataset,
+        build_insights=generate_advanced_insights,
+        answer_question=lambda question, df, insights: answer_question(question, get_llm_client(), df, insights),
+        questions=SUGGESTED_QUESTIONS,
+        fingerprint=make_table_fingerprint(),
+        refresh_interval=refresh_interval
+    )
+    # Ao limpar o cache, a instância anterior precisa parar antes de a nova começar
+    return replace_active_warmup(warmup)
+
+@st.cache_resource
+def load_logo():
+    ey_logo = Image.open(r"EY_Logo.png")
+    return ey_logo.resize((100, 100))
+
+def show_data_status(warmup, was_ready):
+    """
+    Exibe o estado de carregamento e recarrega a página quando os dados ficam prontos
+    """
+    status, version, loaded_at, ready_answers, total_answers, error = warmup.status_snapshot()
+    if status == STATUS_READY:
+        if not was_ready:
+            st.rerun()
+        loaded_at = time.strftime("%d/%m/%Y %H:%M", time.localtime(loaded_at))
+        st.caption(
+            f"✅ Dados prontos (versão {version}, carregada em {loaded_at}) | "
+            f"Sugestões pré-calculadas: {ready_answers}/{total_answers}"
+        )
+    elif status == STATUS_ERROR:
+        st.error(f"Erro ao carregar dados ou gerar insights: {error}")
+        if st.button("Tentar novamente"):
+            warmup.start()
+            st.rerun()
+    else:
+        st.caption("⏳ Carregando dados e gerando insights...")
+
+def respond(prompt, llm, conversation, warmup, version, df, insights):
+    """
+    Responde a pergunta na interface, usando a resposta pré-calculada quando houver
+    """
+    with st.chat_message("assistant"):
+        message_placeholder = st.empty()
+
+        try:
+            with st.spinner(""):
+                response_content = warmup.get_canned_answer(prompt, version)
+                if response_content is not None:
+                    # Registrar a pergunta para que o histórico da conversa mantenha a ordem pergunta/resposta
+                    st.session_state.chat_history_store.add_user_message(prompt)
+                else:
+                    response_content = answer_question(
+                        prompt,
+                        llm,
+                        df,
+                        insights,
+                        conversation
+                    )
+
+                # Simulando streaming para melhor UX
+                full_response = ""
+                for i in range(len(response_content)):
+                    full_response = response_content[:i+1]
+                    message_placeholder.markdown(full_response + "▌")
+                    time.sleep(0.01)
+                message_placeholder.markdown(full_response)
+
+                # Adicionar à exibição do histórico
+                st.session_state.chat_history.append({"role": "assistant", "content": full_response})
+                st.session_state.chat_history_store.add_ai_message(full_response)
+
+        except Exception as e:
+            error_message = f"Erro no processamento: {str(e)}"
+            message_placeholder.markdown(error_message)
+            st.session_state.chat_history.append({"role": "assistant", "content": error_message})
+            st.session_state.chat_history_store.add_ai_message(error_message)
+
+def main():
+    st.title("Chatbot Inadimplinha")
+    st.caption("Chatbot Inadimplinha desenvolvido por Grupo de Inadimplência EY")
+
+    # Dados e insights são carregados e atualizados em segundo plano, sem bloquear a interface.
+    # Cada execução usa a versão publicada mais recente, compartilhada por todas as sessões.
+    warmup = get_data_warmup()
+    status, version, df, insights = warmup.snapshot()
+    ready = status == STATUS_READY
+    if ready and st.session_state.get("data_version") != version:
+        if st.session_state.get("data_version") is not None:
+            st.toast("Os dados de inadimplência foram atualizados.")
+        st.session_state.data_version = version
+
+    # Inicializar o modelo LLM
+    llm = get_llm_client()
 
     # Inicializar o histórico de mensagens
     if "chat_history_store" not in st.session_state:
@@ -286,7 +440,7 @@ def main():
 
     # Envolver a cadeia com histórico de mensagens
     conversation = RunnableWithMessageHistory(
-        runnable=chain,
+        runnable=build_default_chain(llm),
         get_session_history=lambda: st.session_state.chat_history_store,
         input_messages_key="input",
         history_messages_key="chat_history"
@@ -304,6 +458,16 @@ def main():
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
+    # Responder as perguntas enviadas enquanto os dados carregavam
+    if ready:
+        while st.session_state.pending_questions:
+            respond(st.session_state.pending_questions.pop(0), llm, conversation, warmup, version, df, insights)
+    elif st.session_state.pending_questions and status == STATUS_LOADING:
+        st.info(
+            f"{len(st.session_state.pending_questions)} pergunta(s) aguardando o carregamento dos dados. "
+            "Elas serão respondidas automaticamente."
+        )
+
     if prompt := st.chat_input("Faça uma pergunta sobre a inadimplência"):
         # Adicionar a pergunta do usuário à interface de chat
         with st.chat_message("user"):
@@ -312,79 +476,36 @@ def main():
         # Adicionar à exibição do histórico
         st.session_state.chat_history.append({"role": "user", "content": prompt})
         
-        # Processar a resposta
-        with st.chat_message("assistant"):
-            message_placeholder = st.empty()
-            
-            try:
-                with st.spinner(""):
-                    # Classificar a intenção do usuário
-                    intent = classify_user_intent(prompt, llm)
-                    print(f"Intenção classificada como: {intent}")
-                    
-                    # Gerar consulta dinâmica baseada na intenção
-                    dynamic_query = generate_dynamic_query(intent, prompt, llm)
-                    print(f"Consulta dinâmica gerada: {dynamic_query}")
-                    
-                    # Processar a pergunta com insights e resultados dinâmicos
-                    if intent != "GERAL":
-                        response_content = process_question_with_insights(
-                            prompt, 
-                            intent, 
-                            dynamic_query, 
-                            st.session_state.df, 
-                            st.session_state.insights,
-                            llm
-                        )
-                    else:
-                        # Para perguntas gerais, usar o fluxo padrão
-                        response = conversation.invoke(
-                            {"input": prompt, "insights": st.session_state.insights},
-                            config={"configurable": {"session_id": "default"}}
-                        )
-                        response_content = response.content
-                    
-                    # Simulando streaming para melhor UX
-                    full_response = ""
-                    for i in range(len(response_content)):
-                        full_response = response_content[:i+1]
-                        message_placeholder.markdown(full_response + "▌")
-                        time.sleep(0.01)
-                    message_placeholder.markdown(full_response)
-                    
-                    # Adicionar à exibição do histórico
-                    st.session_state.chat_history.append({"role": "assistant", "content": full_response})
-                    st.session_state.chat_history_store.add_ai_message(full_response)
-                
-            except Exception as e:
-                error_message = f"Erro no processamento: {str(e)}"
-                message_placeholder.markdown(error_message)
-                st.session_state.chat_history.append({"role": "assistant", "content": error_message})
-                st.session_state.chat_history_store.add_ai_message(error_message)
+        # Processar a resposta, ou enfileirar enquanto os dados não estão prontos
+        if ready:
+            respond(prompt, llm, conversation, warmup, version, df, insights)
+        else:
+            st.session_state.pending_questions.append(prompt)
+            if status == STATUS_LOADING:
+                st.info("Ainda estou carregando os dados. Sua pergunta será respondida assim que estiverem prontos.")
+            else:
+                st.warning("Os dados não puderam ser carregados. Use \"Tentar novamente\" na barra lateral.")
 
     with st.sidebar:
-        ey_logo = Image.open(r"EY_Logo.png")
-        ey_logo_resized = ey_logo.resize((100, 100))   
-        st.sidebar.image(ey_logo_resized)
+        st.sidebar.image(load_logo())
         st.sidebar.header("EY Academy | Inadimplência")
 
+        # Atualiza o estado a cada segundo apenas enquanto os dados carregam;
+        # após um erro, o botão "Tentar novamente" já provoca a nova execução
+        st.fragment(show_data_status, run_every=1 if status == STATUS_LOADING else None)(warmup, ready)
+
         st.sidebar.subheader("🔍 Sugestões de Análise")
-        st.sidebar.write("➡️ Qual estado com maior inadimplência e quais os valores devidos?")
-        st.sidebar.write("➡️ Qual tipo de cliente apresenta o maior número de operações?")
-        st.sidebar.write("➡️ Em qual modalidade existe maior inadimplência?")
-        st.sidebar.write("➡️ Compare a inadimplência entre PF e PJ")
-        st.sidebar.write("➡️ Qual ocupação entre PF possui maior inadimplência?")
-        st.sidebar.write("➡️ Qual o principal porte de cliente com inadimplência entre PF?")
+        for question in SUGGESTED_QUESTIONS:
+            st.sidebar.write(f"➡️ {question}")
         
         # Botão para limpar histórico de conversa
         if st.button("Limpar Conversa"):
             st.session_state.chat_history_store = InMemoryChatMessageHistory()
             st.session_state.chat_history = []
+            st.session_state.pending_questions = []
             st.session_state.app_initialized = False
             st.rerun()
 
-    conn.dispose()  # Fechar o engine ao final da execução
-
 if __name__ == "__main__":
     main()
 
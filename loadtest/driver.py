@@ -0,0 +1,294 @@
+"""
+Simula N sessões de chat simultâneas executando o fluxo de perguntas do main()
+
+Sobe o servidor LLM local e um banco SQLite populado (a menos que --llm-base-url e
+--database-url sejam informados) e, para cada nível de concorrência, mede a vazão,
+os percentis de latência por etapa e a memória de cada processo.
+
+Uso:
+    python -m loadtest.driver --sessions 1,4,16,32 --questions-per-session 3
+"""
+import argparse
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from loadtest.seed_db import seed_database
+from warmup import STATUS_LOADING, STATUS_READY
+
+FREE_QUESTIONS = [
+    "Qual a taxa de inadimplência na região Nordeste?",
+    "Como evoluiu a inadimplência nos últimos meses?",
+    "Quais setores PJ merecem atenção especial?",
+    "Qual a projeção de inadimplência para os próximos 90 dias?",
+]
+
+STAGES = ["carga", "insights", "intencao", "consulta", "resposta", "sugestao", "exibicao", "total"]
+
+
+class StageRecorder:
+    """
+    Acumula as durações de cada etapa de forma segura entre threads
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(list)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._durations[stage].append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._durations = defaultdict(list)
+
+    def count(self, stage):
+        with self._lock:
+            return len(self._durations.get(stage, []))
+
+    def percentiles(self, stage):
+        with self._lock:
+            values = sorted(self._durations.get(stage, []))
+        if not values:
+            return None
+        pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+        return pick(50), pick(95), pick(99)
+
+
+recorder = StageRecorder()
+
+
+def timed(stage, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            recorder.add(stage, time.perf_counter() - start)
+    return wrapper
+
+
+class TimedConversation:
+    """
+    Mede o tempo de resposta do fluxo padrão (perguntas gerais com histórico)
+    """
+
+    def __init__(self, conversation):
+        self._conversation = conversation
+
+    def invoke(self, *args, **kwargs):
+        return timed("resposta", self._conversation.invoke)(*args, **kwargs)
+
+
+def read_rss_mb(pid="self"):
+    """
+    Retorna (memória residente atual, pico) em MB a partir de /proc, quando disponível
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            fields = dict(line.split(":", 1) for line in status_file if ":" in line)
+        return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        if pid != "self":
+            return None, None
+        return None, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def start_stub_server(args):
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "loadtest.stub_llm",
+            "--latency", str(args.latency),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--answer-tokens", str(args.answer_tokens),
+        ],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    line = process.stdout.readline().strip()
+    if not line:
+        process.kill()
+        raise RuntimeError("O servidor LLM local não iniciou")
+    print(line)
+    return process, line.rsplit(" ", 1)[-1]
+
+
+def run_session(chatbot, warmup, session_id, questions, render_delay):
+    """
+    Reproduz o fluxo de uma sessão do main(): histórico, sugestões pré-calculadas e respostas
+    """
+    from langchain_core.chat_history import InMemoryChatMessageHistory
+    from langchain_core.runnables.history import RunnableWithMessageHistory
+
+    chat_history_store = InMemoryChatMessageHistory()
+    chat_history_store.add_ai_message("Como posso te ajudar hoje?")
+
+    for prompt in questions:
+        start = time.perf_counter()
+        try:
+            # Como no main(), o cliente LLM e a cadeia com histórico são recriados a cada execução
+            llm = chatbot.get_llm_client()
+            conversation = TimedConversation(RunnableWithMessageHistory(
+                runnable=chatbot.build_default_chain(llm),
+                get_session_history=lambda: chat_history_store,
+                input_messages_key="input",
+                history_messages_key="chat_history"
+            ))
+            _, version, df, insights = warmup.snapshot()
+
+            suggestion_start = time.perf_counter()
+            response_content = warmup.get_canned_answer(prompt, version)
+            if response_content is not None:
+                chat_history_store.add_user_message(prompt)
+                recorder.add("sugestao", time.perf_counter() - suggestion_start)
+            else:
+                response_content = chatbot.answer_question(prompt, llm, df, insights, conversation)
+
+            # Efeito de digitação do main(): uma pausa por caractere
+            render_start = time.perf_counter()
+            time.sleep(render_delay * len(response_content))
+            recorder.add("exibicao", time.perf_counter() - render_start)
+
+            chat_history_store.add_ai_message(response_content)
+            recorder.add("total", time.perf_counter() - start)
+        except Exception as e:
+            print(f"Sessão {session_id}: erro ao responder '{prompt}': {e}")
+            recorder.add("erro", time.perf_counter() - start)
+
+
+def build_questions(rng, count, canned_ratio, suggested_questions):
+    return [
+        rng.choice(suggested_questions) if rng.random() < canned_ratio else rng.choice(FREE_QUESTIONS)
+        for _ in range(count)
+    ]
+
+
+def format_ms(values):
+    if values is None:
+        return "-"
+    return "/".join(f"{value * 1000:.0f}" for value in values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões de chat simultâneas")
+    parser.add_argument("--sessions", default="1,4,16", help="níveis de concorrência separados por vírgula")
+    parser.add_argument("--questions-per-session", type=int, default=3)
+    parser.add_argument("--canned-ratio", type=float, default=0.5, help="fração de perguntas sugeridas na sidebar")
+    parser.add_argument("--render-delay", type=float, default=0.01, help="pausa por caractere do efeito de digitação")
+    parser.add_argument("--database-url", help="banco já populado; por padrão cria um SQLite temporário")
+    parser.add_argument("--rows", type=int, default=50000, help="linhas do banco SQLite temporário")
+    parser.add_argument("--llm-base-url", help="servidor LLM já em execução; por padrão sobe o servidor local")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--warmup-timeout", type=float, default=300.0, help="limite em segundos para o aquecimento")
+    args = parser.parse_args()
+
+    stub_process = None
+    if args.llm_base_url is None:
+        stub_process, args.llm_base_url = start_stub_server(args)
+
+    temp_dir = None
+    if args.database_url is None:
+        temp_dir = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{os.path.join(temp_dir.name, 'loadtest.db')}"
+        seed_database(args.database_url, args.rows, args.seed)
+
+    # O chatbot lê estas variáveis na importação e ao criar clientes e conexões
+    os.environ["LLM_BASE_URL"] = args.llm_base_url
+    os.environ["INADIMPLENCIA_DATABASE_URL"] = args.database_url
+    os.environ.setdefault("API_KEY", "stub")
+    os.environ["REFRESH_INTERVAL_SECONDS"] = "0"
+    # Sem "streamlit run" o Streamlit avisa a cada chamada que está em modo bare
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+    try:
+        import chatbot
+
+        chatbot.load_dataset = timed("carga", chatbot.load_dataset)
+        chatbot.generate_advanced_insights = timed("insights", chatbot.generate_advanced_insights)
+        chatbot.classify_user_intent = timed("intencao", chatbot.classify_user_intent)
+        chatbot.generate_dynamic_query = timed("consulta", chatbot.generate_dynamic_query)
+        chatbot.process_question_with_insights = timed("resposta", chatbot.process_question_with_insights)
+
+        # Aquecimento: dados, insights e respostas sugeridas, como no primeiro acesso ao app
+        warmup_start = time.perf_counter()
+        warmup = chatbot.get_data_warmup()
+        deadline = warmup_start + args.warmup_timeout
+        while warmup.status == STATUS_LOADING:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Aquecimento não terminou em {args.warmup_timeout:.0f}s")
+            time.sleep(0.1)
+        if warmup.status != STATUS_READY:
+            raise RuntimeError(f"Falha no aquecimento: {warmup.error}")
+        data_ready = time.perf_counter() - warmup_start
+
+        # Falhas em respostas sugeridas não bloqueiam o teste: elas seguem pelo fluxo completo
+        answers_done = warmup.wait_for_canned_answers(max(0.0, deadline - time.perf_counter()))
+        ready_answers, total_answers = warmup.canned_progress()
+        print(
+            f"\nAquecimento: dados e insights em {data_ready:.1f}s "
+            f"(carga {format_ms(recorder.percentiles('carga'))} ms, insights {format_ms(recorder.percentiles('insights'))} ms), "
+            f"sugestões pré-calculadas {ready_answers}/{total_answers} em {time.perf_counter() - warmup_start:.1f}s"
+            f"{'' if answers_done else ' (tempo esgotado)'}\n"
+        )
+
+        header = f"{'sessões':>7} {'perguntas':>9} {'erros':>5} {'tempo s':>8} {'perg/s':>7} "
+        header += " ".join(f"{stage:>16}" for stage in STAGES[2:])
+        header += f" {'RSS app MB':>11} {'pico app MB':>11} {'RSS LLM MB':>11}"
+        print("Latências em ms (p50/p95/p99)")
+        print(header)
+
+        for level in [int(value) for value in args.sessions.split(",")]:
+            recorder.reset()
+            threads = [
+                threading.Thread(
+                    target=run_session,
+                    args=(
+                        chatbot,
+                        warmup,
+                        session_id,
+                        build_questions(
+                            random.Random(args.seed + session_id),
+                            args.questions_per_session,
+                            args.canned_ratio,
+                            chatbot.SUGGESTED_QUESTIONS
+                        ),
+                        args.render_delay
+                    )
+                )
+                for session_id in range(level)
+            ]
+
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            app_rss, app_peak = read_rss_mb()
+            llm_rss, _ = read_rss_mb(stub_process.pid) if stub_process else (None, None)
+            answered = recorder.count("total")
+            row = f"{level:>7} {answered:>9} {recorder.count('erro'):>5} {elapsed:>8.1f} {answered / elapsed:>7.2f} "
+            row += " ".join(f"{format_ms(recorder.percentiles(stage)):>16}" for stage in STAGES[2:])
+            row += f" {app_rss or 0:>11.0f} {app_peak or 0:>11.0f} {llm_rss or 0:>11.0f}"
+            print(row, flush=True)
+    finally:
+        if stub_process is not None:
+            stub_process.terminate()
+            stub_process.wait()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cria uma tabela table_agg_inad_consolidado sintética em um banco local (SQLite ou Postgres)
+
+Uso:
+    python -m loadtest.seed_db --database-url sqlite:///loadtest.db --rows 50000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+UFS = [
+    "AC", "AM", "AP", "PA", "RO", "RR", "TO", "AL", "BA", "CE", "MA", "PB", "PE", "PI",
+    "RN", "SE", "GO", "MT", "MS", "DF", "SP", "RJ", "MG", "ES", "PR", "RS", "SC"
+]
+CLIENTES = ["PF - Pessoa Física", "PJ - Pessoa Jurídica"]
+PORTES = ["PF - Até 1 salário mínimo", "PF - Mais de 5 a 10 salários mínimos", "PJ - Pequeno", "PJ - Médio", "PJ - Grande"]
+OCUPACOES = ["PF - Empregado de empresa privada", "PF - Servidor ou empregado público", "PF - Aposentado/pensionista", "PF - Autônomo"]
+CNAE_SECOES = ["PJ - Comércio", "PJ - Indústrias de transformação", "PJ - Construção", "PJ - Serviços", "PJ - Agropecuária"]
+MODALIDADES = ["PF - Cartão de crédito", "PF - Empréstimo com consignação em folha", "PF - Veículos", "PJ - Capital de giro", "PJ - Comércio exterior"]
+DATAS_BASE = ["30/09/2024", "31/10/2024", "30/11/2024", "31/12/2024"]
+
+
+def build_dataset(rows, seed=42):
+    """
+    Gera linhas com as mesmas colunas usadas por generate_advanced_insights
+    """
+    rng = np.random.default_rng(seed)
+    carteira_ativa = rng.lognormal(mean=13, sigma=1.5, size=rows).round(2)
+    taxa_inadimplencia = rng.beta(2, 40, size=rows)
+    inadimplida = (carteira_ativa * taxa_inadimplencia).round(2)
+
+    return pd.DataFrame({
+        "data_base": rng.choice(DATAS_BASE, size=rows),
+        "uf": rng.choice(UFS, size=rows),
+        "cliente": rng.choice(CLIENTES, size=rows),
+        "porte": rng.choice(PORTES, size=rows),
+        "ocupacao": rng.choice(OCUPACOES, size=rows),
+        "cnae_secao": rng.choice(CNAE_SECOES, size=rows),
+        "modalidade": rng.choice(MODALIDADES, size=rows),
+        "soma_numero_de_operacoes": rng.integers(1, 5000, size=rows),
+        "soma_a_vencer_ate_90_dias": (carteira_ativa * rng.uniform(0.05, 0.3, size=rows)).round(2),
+        "soma_carteira_ativa": carteira_ativa,
+        "soma_carteira_inadimplida_arrastada": inadimplida,
+        "soma_ativo_problematico": (inadimplida * rng.uniform(1.0, 1.6, size=rows)).round(2),
+    })
+
+
+def seed_database(database_url, rows, seed=42, table="table_agg_inad_consolidado"):
+    engine = create_engine(database_url)
+    try:
+        build_dataset(rows, seed).to_sql(table, engine, if_exists="replace", index=False, chunksize=10000)
+    finally:
+        engine.dispose()
+    print(f"Tabela {table} criada com {rows} linhas em {database_url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Popula um banco local para testes de carga")
+    parser.add_argument("--database-url", default="sqlite:///loadtest.db")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed_database(args.database_url, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Servidor local compatível com a API de chat da OpenAI, usado no lugar do DeepSeek nos testes de carga
+
+Uso:
+    python -m loadtest.stub_llm --port 8001 --latency 0.5 --tokens-per-second 50
+"""
+import argparse
+import json
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_SQL = (
+    "SELECT uf, SUM(soma_carteira_inadimplida_arrastada) AS inadimplencia "
+    "FROM table_agg_inad_consolidado GROUP BY uf ORDER BY inadimplencia DESC LIMIT 5"
+)
+
+
+def build_reply(messages, answer_tokens):
+    """
+    Gera uma resposta plausível para cada etapa do fluxo do chatbot
+    """
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    question = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+
+    # Classificação de intenção: a mesma pergunta recebe sempre a mesma categoria
+    if "classifique a intenção" in system:
+        return str(zlib.crc32(question.encode("utf-8")) % 5 + 1)
+    if "especialista em SQL" in system:
+        return STUB_SQL
+
+    words = ["A", "inadimplência", "em", "dezembro", "de", "2024", "somou", "R$", "1.234.567,89", "no", "segmento", "analisado."]
+    return " ".join(words[i % len(words)] for i in range(answer_tokens))
+
+
+def make_handler(latency, tokens_per_second, answer_tokens):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            content = build_reply(body.get("messages", []), answer_tokens)
+            completion_tokens = len(content.split())
+
+            # Simular o tempo até o primeiro token e a geração dos demais
+            time.sleep(latency + completion_tokens / tokens_per_second)
+
+            payload = json.dumps({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "deepseek-chat"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in body.get("messages", [])),
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": completion_tokens
+                }
+            }).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor LLM local para testes de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 escolhe uma porta livre")
+    parser.add_argument("--latency", type=float, default=0.5, help="segundos até o primeiro token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=150, help="tamanho das respostas finais")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port),
+        make_handler(args.latency, args.tokens_per_second, args.answer_tokens)
+    )
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    print(f"Servidor LLM local em http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
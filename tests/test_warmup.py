@@ -0,0 +1,124 @@
+import time
+
+from warmup import DataWarmup, replace_active_warmup, STATUS_READY
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "tempo esgotado aguardando a condição"
+        time.sleep(0.01)
+
+
+def make_warmup(load_data, fingerprint, answer_question=None, questions=()):
+    return DataWarmup(
+        load_data=load_data,
+        build_insights=lambda df: f"insights de {df}",
+        answer_question=answer_question or (lambda question, df, insights: f"{question} @ {df}"),
+        questions=questions,
+        fingerprint=fingerprint,
+        refresh_interval=0.01
+    )
+
+
+def test_failed_refresh_keeps_previous_version():
+    loads = []
+
+    def load_data():
+        loads.append(None)
+        if len(loads) > 1:
+            raise RuntimeError("banco indisponível")
+        return "v1"
+
+    fingerprints = iter(range(1000))
+    warmup = make_warmup(load_data, lambda: next(fingerprints))
+    try:
+        warmup.start()
+        wait_for(lambda: len(loads) >= 3)
+
+        assert warmup.snapshot() == (STATUS_READY, 1, "v1", "insights de v1")
+        assert warmup.error is None
+    finally:
+        warmup.stop(timeout=5)
+
+
+def test_unchanged_fingerprint_does_not_reload():
+    loads = []
+    checks = []
+
+    def fingerprint():
+        checks.append(None)
+        return (100, "2024-12-31", None)
+
+    def load_data():
+        loads.append(None)
+        return "v1"
+
+    warmup = make_warmup(load_data, fingerprint)
+    try:
+        warmup.start()
+        wait_for(lambda: len(checks) >= 5)
+
+        assert len(loads) == 1
+        assert warmup.version == 1
+    finally:
+        warmup.stop(timeout=5)
+
+
+def test_refresh_replaces_answers_of_previous_version():
+    datasets = iter(["v1", "v2"])
+    current_fingerprint = ["fp1"]
+    warmup = make_warmup(lambda: next(datasets), lambda: current_fingerprint[0], questions=["Pergunta A"])
+    try:
+        warmup.start()
+        wait_for(lambda: warmup.version == 1)
+        assert warmup.wait_for_canned_answers(timeout=5)
+        assert warmup.get_canned_answer("Pergunta A", 1) == "Pergunta A @ v1"
+
+        current_fingerprint[0] = "fp2"
+        wait_for(lambda: warmup.version == 2)
+        assert warmup.wait_for_canned_answers(timeout=5)
+
+        status, version, df, _ = warmup.snapshot()
+        assert (status, version, df) == (STATUS_READY, 2, "v2")
+        assert warmup.get_canned_answer("Pergunta A", version) == "Pergunta A @ v2"
+        assert warmup.get_canned_answer("Pergunta A", 1) is None
+    finally:
+        warmup.stop(timeout=5)
+
+
+def test_failed_canned_answer_still_finishes_precomputation():
+    def answer_question(question, df, insights):
+        if question == "Pergunta B":
+            raise TimeoutError("LLM não respondeu")
+        return f"{question} @ {df}"
+
+    warmup = make_warmup(lambda: "v1", None, answer_question, ["Pergunta A", "Pergunta B"])
+    try:
+        warmup.start()
+
+        assert warmup.wait_for_canned_answers(timeout=5)
+        assert warmup.canned_progress() == (1, 2)
+        assert warmup.error is None
+    finally:
+        warmup.stop(timeout=5)
+
+
+def test_replacing_active_warmup_stops_previous_thread():
+    checks = []
+
+    def fingerprint():
+        checks.append(None)
+        return "mesma"
+
+    previous = replace_active_warmup(make_warmup(lambda: "v1", fingerprint))
+    current = replace_active_warmup(make_warmup(lambda: "v1", lambda: "mesma"))
+    try:
+        previous._thread.join(5)
+        assert not previous._thread.is_alive()
+        stopped_checks = len(checks)
+        time.sleep(0.05)
+        assert len(checks) == stopped_checks
+        assert current._thread.is_alive()
+    finally:
+        current.stop(timeout=5)
@@ -0,0 +1,217 @@
+import threading
+import time
+
+STATUS_LOADING = "loading"
+STATUS_READY = "ready"
+STATUS_ERROR = "error"
+
+_active_warmup = None
+_active_lock = threading.Lock()
+
+
+def normalize_question(question):
+    """
+    Normaliza a pergunta para comparação com as respostas pré-calculadas
+    """
+    return " ".join(question.strip().lower().split()).rstrip("?")
+
+
+class DataWarmup:
+    """
+    Carrega os dados, gera os insights e pré-calcula respostas em segundo plano,
+    recarregando tudo quando a assinatura da tabela muda
+
+    Params:
+        load_data: função sem argumentos que retorna o DataFrame da tabela
+        build_insights: função que recebe o DataFrame e retorna os insights
+        answer_question: função (pergunta, df, insights) que retorna a resposta
+        questions: perguntas sugeridas cujas respostas devem ser pré-calculadas
+        fingerprint: função sem argumentos que retorna uma assinatura barata da tabela
+        refresh_interval: intervalo em segundos entre verificações de alteração (0 desativa)
+    """
+
+    def __init__(self, load_data, build_insights, answer_question, questions,
+                 fingerprint=None, refresh_interval=0):
+        self._load_data = load_data
+        self._build_insights = build_insights
+        self._answer_question = answer_question
+        self._questions = list(questions)
+        self._fingerprint = fingerprint
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = STATUS_LOADING
+        self._error = None
+        self._df = None
+        self._insights = None
+        self._canned_answers = {}
+        self._version = 0
+        self._loaded_at = None
+        self._current_fingerprint = None
+        self._answers_done = threading.Event()
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        Inicia o carregamento e a atualização em segundo plano (ou reinicia após um erro)
+        """
+        with self._lock:
+            if self._stop.is_set() or (self._thread is not None and self._status != STATUS_ERROR):
+                return
+            self._status = STATUS_LOADING
+            self._error = None
+            self._answers_done.clear()
+            self._thread = threading.Thread(target=self._run, name="data-warmup", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Interrompe o carregamento e a atualização; com timeout, aguarda a thread terminar
+        """
+        self._stop.set()
+        self._answers_done.set()
+        thread = self._thread
+        if timeout is not None and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _run(self):
+        if not self._reload(self._read_fingerprint()):
+            return
+
+        # Verificar periodicamente se a tabela mudou e recarregar fora da interface
+        while self._refresh_interval and not self._stop.wait(self._refresh_interval):
+            fingerprint = self._read_fingerprint()
+            if fingerprint is None or fingerprint == self._current_fingerprint:
+                continue
+            print(f"Alteração detectada na tabela: {self._current_fingerprint} -> {fingerprint}")
+            self._reload(fingerprint)
+
+    def _read_fingerprint(self):
+        if self._fingerprint is None:
+            return None
+        try:
+            return self._fingerprint()
+        except Exception as e:
+            print(f"Erro ao verificar alterações na tabela: {e}")
+            return None
+
+    def _reload(self, fingerprint):
+        """
+        Gera uma nova versão dos dados e insights e a publica de uma vez para todas as sessões
+        """
+        start_time = time.time()
+        try:
+            df = self._load_data()
+            insights = self._build_insights(df)
+        except Exception as e:
+            print(f"Erro ao carregar dados ou gerar insights: {e}")
+            with self._lock:
+                # Em uma atualização com falha, a versão anterior continua em uso
+                if self._df is None:
+                    self._status = STATUS_ERROR
+                    self._error = str(e)
+                    self._answers_done.set()
+            return False
+
+        if self._stop.is_set():
+            return False
+
+        with self._lock:
+            self._df = df
+            self._insights = insights
+            self._canned_answers = {}
+            self._current_fingerprint = fingerprint
+            self._loaded_at = time.time()
+            self._version += 1
+            self._status = STATUS_READY
+            self._answers_done.clear()
+            version = self._version
+        print(f"Dados e insights (versão {version}) prontos em {time.time() - start_time:.1f}s")
+
+        # Pré-calcular as respostas das perguntas sugeridas para a nova versão
+        for question in self._questions:
+            if self._stop.is_set():
+                return False
+            try:
+                answer = self._answer_question(question, df, insights)
+            except Exception as e:
+                print(f"Erro ao pré-calcular resposta para '{question}': {e}")
+                continue
+            with self._lock:
+                self._canned_answers[normalize_question(question)] = answer
+        print(f"Respostas sugeridas pré-calculadas em {time.time() - start_time:.1f}s")
+        self._answers_done.set()
+        return True
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._status
+
+    @property
+    def error(self):
+        with self._lock:
+            return self._error
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version
+
+    def snapshot(self):
+        """
+        Retorna (status, versão, df, insights) de forma consistente
+        """
+        with self._lock:
+            return self._status, self._version, self._df, self._insights
+
+    def status_snapshot(self):
+        """
+        Retorna (status, versão, carregada em, respostas prontas, total de sugestões, erro)
+        de forma consistente, para exibição na interface
+        """
+        with self._lock:
+            return (
+                self._status,
+                self._version,
+                self._loaded_at,
+                len(self._canned_answers),
+                len(self._questions),
+                self._error
+            )
+
+    def get_canned_answer(self, question, version):
+        """
+        Retorna a resposta pré-calculada para a pergunta, se existir para a versão informada
+        """
+        with self._lock:
+            if version != self._version:
+                return None
+            return self._canned_answers.get(normalize_question(question))
+
+    def wait_for_canned_answers(self, timeout=None):
+        """
+        Aguarda o fim do pré-cálculo da versão atual (com ou sem falhas) ou de um carregamento
+        com erro; retorna False se o tempo se esgotar
+        """
+        return self._answers_done.wait(timeout)
+
+    def canned_progress(self):
+        """
+        Retorna (respostas prontas, total de perguntas sugeridas)
+        """
+        with self._lock:
+            return len(self._canned_answers), len(self._questions)
+
+
+def replace_active_warmup(warmup):
+    """
+    Para a instância ativa anterior (ex.: após limpar o cache do Streamlit) e inicia a nova
+    """
+    global _active_warmup
+    with _active_lock:
+        if _active_warmup is not None and _active_warmup is not warmup:
+            _active_warmup.stop()
+        _active_warmup = warmup
+    warmup.start()
+    return warmup